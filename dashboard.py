@@ -1,14 +1,20 @@
+import io
 import os
+import re
 import sys
+import glob
+import hashlib
 import shutil
 import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
 import pandas as pd
 import streamlit as st
-import plotly.express as px
 import numpy as np
-from textblob import TextBlob
-import joblib
+import pyarrow.csv as pacsv
+from snapshot_io import fresh_parquet, parquet_path
 
 # ---------------- Streamlit Page Config ----------------
 st.set_page_config(
@@ -31,8 +37,59 @@ st.markdown("""
 
 
 # ---------------- Orchestration (Scrape → Ingest → Notify) ----------------
+PIPELINE_CACHE_DIR = "data/.cache"
+
+# Files each stage reads; a stage reruns when the day or any input's mtime changes
+STAGE_INPUTS = {
+    "product.py": (),
+    "ingestion.py": ("my_docs/mobile.csv", "my_docs/review.csv"),
+    "sentiment.py": ("data/cleaned_reviews.csv",),
+    "notifications": ("my_docs/mobile.csv", "my_docs/mobile_yesterday.csv",
+                      "my_docs/review.csv", "my_docs/review_yesterday.csv"),
+}
+
+
+def stage_sentinel(stage):
+    """Sentinel path for a stage run today against the current state of its inputs."""
+    mtimes = [f"{p}:{os.path.getmtime(p)}" for p in STAGE_INPUTS.get(stage, ()) if os.path.exists(p)]
+    key = hashlib.sha1(f"{stage}|{date.today()}|{'|'.join(mtimes)}".encode()).hexdigest()
+    return os.path.join(PIPELINE_CACHE_DIR, f"{stage}_{key}.done")
+
+
+def run_cached_stage(stage, run):
+    """Run a pipeline stage unless it already completed today on the same inputs."""
+    sentinel = stage_sentinel(stage)
+    if os.path.exists(sentinel):
+        return False
+    if run() is not False:
+        os.makedirs(PIPELINE_CACHE_DIR, exist_ok=True)
+        # One sentinel per stage: older days/input states can never match again
+        for old in glob.glob(os.path.join(PIPELINE_CACHE_DIR, f"{stage}_*.done")):
+            os.remove(old)
+        open(sentinel, "w").close()
+    return True
+
+
+def snapshot_file(src, dst):
+    """Hardlink src to dst (O(1), no data copied); byte-copy where links are unsupported.
+
+    Safe because product.py replaces its outputs atomically instead of rewriting
+    them in place, so the linked snapshot keeps yesterday's contents.
+    """
+    tmp = dst + ".tmp"
+    try:
+        if os.path.exists(dst) and os.path.samefile(src, dst):
+            return  # already linked (no scrape since last rotation); rename() would be a no-op
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        os.link(src, tmp)
+        os.replace(tmp, dst)
+    except OSError:
+        shutil.copy2(src, dst)  # keeps mtime, which Parquet freshness checks compare
+
+
 def rotate_snapshots():
-    """Copy today's CSVs to yesterday snapshots for diff-based notifications."""
+    """Snapshot today's CSVs as yesterday's for diff-based notifications."""
     try:
         os.makedirs("my_docs", exist_ok=True)
         src_dst_pairs = [
@@ -40,8 +97,15 @@ def rotate_snapshots():
             ("my_docs/review.csv", "my_docs/review_yesterday.csv"),
         ]
         for src, dst in src_dst_pairs:
-            if os.path.exists(src):
-                shutil.copyfile(src, dst)
+            if not os.path.exists(src):
+                continue
+            snapshot_file(src, dst)
+            # Carry the Parquet sibling only when it matches its CSV; a stale one
+            # (failed Parquet write) would otherwise be read as yesterday's data
+            if fresh_parquet(src):
+                snapshot_file(parquet_path(src), parquet_path(dst))
+            elif os.path.exists(parquet_path(dst)):
+                os.remove(parquet_path(dst))
     except Exception as e:
         st.warning(f"Snapshot rotation issue: {e}")
 
@@ -55,98 +119,198 @@ def run_script(path):
         raise
 
 
+def run_script_chain(paths):
+    """Run scripts one after another in a worker thread (no Streamlit calls here)."""
+    for path in paths:
+        run_cached_stage(path, partial(subprocess.run, [sys.executable, path], check=True))
+
+
 def trigger_notifications():
     print("DEBUG: trigger_notifications called from dashboard!")
     try:
         import notification as notif
         sent_notification_ids = notif.get_sent_notification_ids()
-        notif.check_price_drops(sent_notification_ids)
-        notif.check_negative_reviews(sent_notification_ids)
-        notif.send_test_notification(lambda msg: st.info(msg))  # Show result in Streamlit UI
+        with notif.smtp_session() as server:
+            try:
+                notif.check_price_drops(sent_notification_ids, server)
+                notif.check_negative_reviews(sent_notification_ids, server)
+            finally:
+                notif.flush_notifications()  # log whatever was emailed, even if a later check raised
+            notif.send_test_notification(lambda msg: st.info(msg), server)  # Show result in Streamlit UI
         st.info("Notifications logic executed. Check console for debug output.")
+        return True
     except Exception as e:
         import traceback
         st.error(f"Notifications step encountered an issue: {e}\n{traceback.format_exc()}")
+        return False
+
+
+def scrape():
+    """Rotate yesterday's snapshots, then scrape fresh product and review data."""
+    rotate_snapshots()
+    run_script("product.py")
 
 
 def orchestrate_pipeline():
     with st.spinner("🔄 Starting pipeline..."):
         # Step 1: Scraping
         st.info("Step 1: Scraping product and review data...")
-        rotate_snapshots()
-        run_script("product.py")
-        st.success("✅ Scraping complete.")
-
-        # Step 2: Ingestion and ML model training
-        st.info("Step 2: Data ingestion, cleaning, and ML model training...")
-        run_script("ingestion.py")
-        st.success("✅ Ingestion and ML model training complete.")
-
-        # Step 3: Sentiment analysis
-        st.info("Step 3: Sentiment analysis using OpenAI...")
-        run_script("sentiment.py")
-        st.success("✅ Sentiment analysis complete.")
-
-        # Step 4: Notifications
-        st.info("Step 4: Running notifications (price drops, negative reviews)...")
-        time.sleep(0.5)
-        trigger_notifications()
-        st.success("✅ Notifications sent.")
+        if run_cached_stage("product.py", scrape):
+            st.success("✅ Scraping complete.")
+        else:
+            st.success("✅ Already scraped today, reusing data.")
+
+        # Steps 2-3 only need the scraped data and Step 4 only needs the snapshots,
+        # so ingestion → sentiment runs in the background while notifications go out.
+        st.info("Step 2-3: Data ingestion, ML model training and sentiment analysis (background)...")
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            analysis = pool.submit(run_script_chain, ["ingestion.py", "sentiment.py"])
+
+            # Step 4: Notifications
+            st.info("Step 4: Running notifications (price drops, negative reviews)...")
+            time.sleep(0.5)
+            if run_cached_stage("notifications", trigger_notifications):
+                st.success("✅ Notifications sent.")
+            else:
+                st.success("✅ Snapshots unchanged since last notification run.")
+
+            try:
+                analysis.result()
+            except subprocess.CalledProcessError as e:
+                st.error(f"Failed running {e.cmd[-1]}: {e}")
+                raise
+        st.success("✅ Ingestion, ML model training and sentiment analysis complete.")
 
         # Step 5: Dashboard will be displayed after login
         st.info("Step 5: Dashboard ready. Please log in to continue.")
 
 
+# ---------------- Cached Loaders ----------------
+# Map sentiment labels to scores for average calculation
+SENTIMENT_SCORES = {"Positive": 1, "Neutral": 0, "Negative": -1,
+                    "positive": 1, "neutral": 0, "negative": -1}
+
+# Low-cardinality key columns: filters compare integer codes, not strings
+CATEGORICAL_COLUMNS = ("product_name", "source", "product_id")
+
+
+def _to_categorical(df):
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _read_table(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, engine="pyarrow")
+
+
+# mtime is part of the cache key so a pipeline rewrite of the file invalidates it.
+@st.cache_data(show_spinner=False)
+def _load_products(path, mtime):
+    """Read the cleaned product table (CSV or Parquet) and normalize its schema."""
+    df = _read_table(path)
+    df.rename(columns={
+        "mobilename": "product_name",
+        "sellingprice": "price",
+        "discountoffering": "discount",
+        "rating": "rating",
+        "productid": "product_id",
+        "source": "source"
+    }, inplace=True)
+    df["price"] = pd.to_numeric(df["price"], errors="coerce")
+    df["discount"] = pd.to_numeric(df["discount"], errors="coerce").fillna(0)
+    df["rating"] = pd.to_numeric(df["rating"], errors="coerce").fillna(0)
+    return _to_categorical(df)
+
+
+@st.cache_data(show_spinner=False)
+def _load_reviews(path, mtime):
+    """Read the sentiment-labelled review table (CSV or Parquet) and normalize its schema."""
+    df = _read_table(path)
+    df.rename(columns={
+        "mobilename": "product_name",
+        "review": "review_text",
+        "rating": "rating",
+        "reviewdate": "date",
+        "productid": "product_id",
+        "source": "source"
+    }, inplace=True)
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+
+    # Score every review once here instead of per product view
+    if "sentiment" in df.columns:
+        df["sentiment_score"] = df["sentiment"].map(SENTIMENT_SCORES).fillna(0)
+    else:
+        # No OpenAI labels yet: single TextBlob pass over the column
+        from textblob import TextBlob
+        polarity = np.fromiter(
+            (TextBlob(str(t)).sentiment.polarity for t in df["review_text"]),
+            dtype=np.float64, count=len(df))
+        df["sentiment_score"] = polarity
+        df["sentiment"] = np.select([polarity > 0.1, polarity < -0.1],
+                                    ["Positive", "Negative"], default="Neutral")
+    return _to_categorical(df)
+
+
 # ---------------- Competitor Analyzer ----------------
 class CompetitorAnalyzer:
     def __init__(self):
         self.products_df = None
         self.reviews_df = None
+        self.avg_sentiment = None
+        self._sentiment_dist = {}
+        self._review_counts = {}
+        self._reviews_by_name = {}
+        self._rows_by_name = {}
+        self._products_by_name = {}
+        self._by_source = {}
 
     def load_data(self,
                   products_file="data/cleaned_mobile.csv",
                   reviews_file="reviews_with_sentiment.csv") -> bool:
         """Load cleaned product & review datasets, apply schema normalization."""
         try:
-            # Load product data
+            # Load product data (prefer the columnar Parquet copy when it is current)
             if os.path.exists(products_file):
-                self.products_df = pd.read_csv(products_file)
-                self.products_df.rename(columns={
-                    "mobilename": "product_name",
-                    "sellingprice": "price",
-                    "discountoffering": "discount",
-                    "rating": "rating",
-                    "productid": "product_id",
-                    "source": "source"
-                }, inplace=True)
+                path = fresh_parquet(products_file) or products_file
+                self.products_df = _load_products(path, os.path.getmtime(path))
             else:
                 st.error(f"Missing {products_file}")
                 return False
 
             # Load review data (with OpenAI sentiment)
             if os.path.exists(reviews_file):
-                self.reviews_df = pd.read_csv(reviews_file)
-                self.reviews_df.rename(columns={
-                    "mobilename": "product_name",
-                    "review": "review_text",
-                    "rating": "rating",
-                    "reviewdate": "date",
-                    "productid": "product_id",
-                    "source": "source"
-                }, inplace=True)
+                path = fresh_parquet(reviews_file) or reviews_file
+                self.reviews_df = _load_reviews(path, os.path.getmtime(path))
             else:
                 st.error(f"Missing {reviews_file}")
                 return False
 
-            # Convert data types
-            self.products_df["price"] = pd.to_numeric(
-                self.products_df["price"], errors="coerce")
-            self.products_df["discount"] = pd.to_numeric(
-                self.products_df["discount"], errors="coerce").fillna(0)
-            self.products_df["rating"] = pd.to_numeric(
-                self.products_df["rating"], errors="coerce").fillna(0)
-            self.reviews_df["date"] = pd.to_datetime(
-                self.reviews_df["date"], errors="coerce")
+            # Per-product sentiment aggregates, one groupby instead of a scan per lookup
+            grp = self.reviews_df.groupby("product_name", observed=True)
+            self.avg_sentiment = grp["sentiment_score"].mean()
+            self._sentiment_dist = grp["sentiment"].value_counts().unstack(fill_value=0).to_dict(orient="index")
+            self._review_counts = grp.size().to_dict()
+            self._reviews_by_name = dict(iter(grp))
+
+            # Hash indexes so per-click lookups are dict gets, not column scans.
+            # Built before the derived columns below so the displayed tables stay raw data.
+            self._rows_by_name = dict(iter(self.products_df.groupby("product_name", observed=True)))
+            self._by_source = dict(iter(self.products_df.groupby("source", observed=True)))
+
+            # Batch price predictions: one vectorized call instead of one per click
+            predicted = predict_prices_lgbm(self.products_df)
+            self.products_df["predicted_price"] = predicted if predicted is not None else np.nan
+
+            # Strategy text for all products in one vectorized pass
+            self.products_df["strategy"] = build_strategies(
+                self.products_df, self.avg_sentiment, self._review_counts)
+
+            first_rows = self.products_df.drop_duplicates("product_name")
+            self._products_by_name = dict(zip(first_rows["product_name"], first_rows.to_dict("records")))
 
             return True
         except Exception as e:
@@ -155,51 +319,101 @@ class CompetitorAnalyzer:
 
     # ---------- Sentiment Analysis (OpenAI labels) ----------
     def get_sentiment_analysis(self, product_name):
-        """Return sentiment distribution for a given product using OpenAI labels."""
-        df = self.reviews_df[self.reviews_df["product_name"] == product_name].copy()
-        if df.empty or "sentiment" not in df.columns:
+        """Return sentiment distribution for a given product from the precomputed aggregates."""
+        if product_name not in self._review_counts:
             return None
 
-        # Map sentiment to scores for average calculation
-        sentiment_map = {"Positive": 1, "Neutral": 0, "Negative": -1,
-                         "positive": 1, "neutral": 0, "negative": -1}
-        df["sentiment_score"] = df["sentiment"].map(sentiment_map).fillna(0)
-
         return {
-            "total_reviews": len(df),
-            "sentiment_distribution": df["sentiment"].value_counts().to_dict(),
-            "average_sentiment_score": df["sentiment_score"].mean(),
-            "reviews_data": df
+            "total_reviews": self._review_counts[product_name],
+            "sentiment_distribution": {label: n for label, n in self._sentiment_dist.get(product_name, {}).items() if n},
+            "average_sentiment_score": self.avg_sentiment[product_name],
+            "reviews_data": self._reviews_by_name[product_name]
         }
 
 
 # Move ML prediction function outside the class
-def predict_price_lgbm(discount, rating):
+PRICE_MODEL_FILE = "data/price_predictor_lgbm.joblib"
+
+
+@st.cache_resource(show_spinner=False)
+def _get_price_model(path, mtime):
+    """Deserialize the LightGBM model once; retraining (new mtime) reloads it."""
+    import joblib
+    return joblib.load(path)
+
+
+def predict_prices_lgbm(products_df):
+    """Score every product in one model.predict call; None if the model is unavailable."""
     try:
-        import pandas as pd
-        model = joblib.load("data/price_predictor_lgbm.joblib")
-        X_new = pd.DataFrame([[discount, rating]], columns=["discountoffering", "rating"])
-        pred = model.predict(X_new)[0]
-        return round(pred, 2)
+        model = _get_price_model(PRICE_MODEL_FILE, os.path.getmtime(PRICE_MODEL_FILE))
+        X = products_df[["discount", "rating"]].rename(columns={"discount": "discountoffering"})
+        return np.round(model.predict(X), 2)
     except Exception as e:
         st.warning(f"ML prediction error: {e}")
         return None
 
 
+def build_strategies(products_df, avg_sentiment, review_counts):
+    """Strategy text for every product at once: one np.select per rule family."""
+    price, discount = products_df["price"], products_df["discount"]
+    price_str, discount_str = price.astype(str), discount.astype(str)
+    names = products_df["product_name"]
+    avg_score = names.map(avg_sentiment).astype(float).fillna(0)
+    total_reviews = names.map(review_counts).astype(float).fillna(0)
+
+    # each rule emits its line with a trailing newline, or "" when it does not apply
+    lines = (
+        np.select([price > 50000, price < 20000], [
+            "- High price (₹" + price_str + "). Consider limited-time discounts or EMI options.\n",
+            "- Competitive price (₹" + price_str + ") can be marketed aggressively.\n",
+        ], default=""),
+        np.select([discount < 5, discount > 20], [
+            "- Low discount (" + discount_str + "%). Increase for better customer pull.\n",
+            "- High discount (" + discount_str + "%). Maintain during campaigns.\n",
+        ], default=""),
+        np.select([avg_score < 0, avg_score < 0.2], [
+            "- Negative sentiment detected. Investigate recurring complaints.\n",
+            "- Neutral sentiment. Enhance product features or promotions.\n",
+        ], default="- Positive sentiment! Highlight strengths in campaigns.\n"),
+        np.select([total_reviews < 10, total_reviews > 100], [
+            "- Very few reviews. Encourage customers to share feedback.\n",
+            "- High review volume. Mine insights for product improvements.\n",
+        ], default=""),
+    )
+    strategy = lines[0].astype(object) + lines[1] + lines[2] + lines[3]
+    return pd.Series(strategy, index=products_df.index).str.rstrip("\n")
+
+
+# ---------------- Cached Figures ----------------
+# Data goes into the cache key, so a figure is rebuilt only when its inputs change.
+@st.cache_data(show_spinner=False)
+def _sentiment_pie(product_name, dist_items):
+    import plotly.express as px
+    dist = dict(dist_items)
+    return px.pie(values=list(dist.values()), names=list(dist.keys()),
+                  title="Sentiment Distribution")
+
+
+@st.cache_data(show_spinner=False)
+def _competitor_price_bar(source, comp):
+    import plotly.express as px
+    return px.bar(comp, x="product_name", y="price", color="price",
+                  title=f"Competitor Price Comparison ({source})")
+
+
 # ---------------- Dashboard Sections ----------------
+@st.fragment
 def product_analysis(analyzer, product_name):
     st.info(f"🔍 Showing analysis for: {product_name}")
-    df = analyzer.products_df[analyzer.products_df["product_name"] == product_name]
-    if df.empty:
+    prod = analyzer._products_by_name.get(product_name)
+    if prod is None:
         st.warning("No data available for this product.")
         return
+    df = analyzer._rows_by_name[product_name]
 
     # Show predicted price at the top
-    prod = df.iloc[0]
-    discount = prod["discount"]
-    rating = prod["rating"]
-    predicted_price = predict_price_lgbm(discount, rating)
-    if predicted_price is not None:
+    predicted_price = prod["predicted_price"]
+    if pd.notna(predicted_price):
         st.success(f"Predicted Price (LightGBM): ₹{predicted_price}")
     else:
         st.warning("Could not predict price for this product.")
@@ -221,20 +435,17 @@ def product_analysis(analyzer, product_name):
 
         col1, col2 = st.columns([2, 1])
         with col1:
-            fig = px.pie(values=list(sdata["sentiment_distribution"].values()),
-                         names=list(sdata["sentiment_distribution"].keys()),
-                         title="Sentiment Distribution")
+            fig = _sentiment_pie(product_name, tuple(sorted(sdata["sentiment_distribution"].items())))
             st.plotly_chart(fig, config={"responsive": True})
         with col2:
             st.metric("Total Reviews", sdata["total_reviews"])
             st.metric("Avg Sentiment Score", f"{sdata['average_sentiment_score']:.2f}")
 
         st.markdown("### Recent Reviews")
-        for _, r in sdata["reviews_data"].head(5).iterrows():
-            sent = r["sentiment"]
-            sc = r.get("sentiment_score", 0)
-            with st.expander(f"{r['userid']} - Rating: {r['rating']}"):
-                st.write(r["review_text"])
+        recent = sdata["reviews_data"].head(5)[["userid", "rating", "review_text", "sentiment", "sentiment_score"]]
+        for userid, rating, text, sent, sc in recent.itertuples(index=False, name=None):
+            with st.expander(f"{userid} - Rating: {rating}"):
+                st.write(text)
                 st.write(f"Sentiment: {sent} (score {sc:.2f})")
     else:
         st.info("No reviews available.")
@@ -245,19 +456,21 @@ def product_analysis(analyzer, product_name):
 
     # ...existing code...
 
+@st.fragment
 def competitor_comparison(analyzer, product_name):
     """Compare product with competitors in same source and nearby price range."""
     st.markdown('<div class="section-header">Competitor Comparison</div>', unsafe_allow_html=True)
 
-    source = analyzer.products_df.query("product_name==@product_name")["source"].iloc[0]
-    comp = analyzer.products_df.query("source==@source and product_name!=@product_name")
+    prod = analyzer._products_by_name[product_name]
+    source = prod["source"]
+    comp = analyzer._by_source.get(source, analyzer.products_df.iloc[0:0])
+    comp = comp[comp["product_name"].values != product_name]
     if comp.empty:
         st.info("No competitor data available.")
         return
 
     # Competitor price comparison chart
-    fig = px.bar(comp, x="product_name", y="price", color="price",
-                 title=f"Competitor Price Comparison ({source})")
+    fig = _competitor_price_bar(source, comp[["product_name", "price"]])
     st.plotly_chart(fig, config={"responsive": True})
 
     # Competitor table
@@ -265,61 +478,33 @@ def competitor_comparison(analyzer, product_name):
 
     # Use sidebar-selected product for nearby comparison
     selected_product = product_name
-    selected_price = analyzer.products_df.query("product_name==@selected_product")["price"].values[0]
+    selected_price = prod["price"]
     st.markdown(f"Showing products around ₹{selected_price}")
 
     lower_bound, upper_bound = selected_price * 0.8, selected_price * 1.2
-    nearby_products = analyzer.products_df.query(
-        "price >= @lower_bound and price <= @upper_bound"
-    ).copy()
-
-    sentiment_scores = []
-    for prod in nearby_products["product_name"]:
-        sentiment_info = analyzer.get_sentiment_analysis(prod)
-        sentiment_scores.append(sentiment_info["average_sentiment_score"] if sentiment_info else np.nan)
-    nearby_products["avg_sentiment"] = sentiment_scores
-    nearby_products.sort_values(by="avg_sentiment", ascending=False, inplace=True)
+    prices = analyzer.products_df["price"].values
+    mask = (prices >= lower_bound) & (prices <= upper_bound)
+    nearby = analyzer.products_df.loc[mask, ["product_name", "source", "price", "discount", "rating", "url"]]
+    nearby_products = nearby.assign(
+        avg_sentiment=nearby["product_name"].map(analyzer.avg_sentiment).astype(float)
+    ).sort_values(by="avg_sentiment", ascending=False)
 
     cols = ["product_name", "source", "price", "discount", "rating", "avg_sentiment", "url"]
     st.dataframe(nearby_products[cols])
 
-    same_product_sources = analyzer.products_df.query("product_name==@selected_product")
+    same_product_sources = analyzer._rows_by_name[selected_product]
     st.markdown(f"'{selected_product}' Price & Discount Across Sources:")
     st.dataframe(same_product_sources[["source", "price", "discount", "rating", "url"]])
 
 
+@st.fragment
 def strategic_recommendations(analyzer, product_name):
     """Generate pricing, discount, sentiment, and review-based strategy suggestions."""
     st.markdown('<div class="section-header">Strategic Recommendations</div>', unsafe_allow_html=True)
 
-    prod = analyzer.products_df.query("product_name==@product_name").iloc[0]
+    prod = analyzer._products_by_name[product_name]
     sdata = analyzer.get_sentiment_analysis(product_name)
     avg_score = sdata["average_sentiment_score"] if sdata else 0
-    total_reviews = sdata["total_reviews"] if sdata else 0
-
-    strategy_lines = []
-
-    if prod["price"] > 50000:
-        strategy_lines.append(f"- High price (₹{prod['price']}). Consider limited-time discounts or EMI options.")
-    elif prod["price"] < 20000:
-        strategy_lines.append(f"- Competitive price (₹{prod['price']}) can be marketed aggressively.")
-
-    if prod["discount"] < 5:
-        strategy_lines.append(f"- Low discount ({prod['discount']}%). Increase for better customer pull.")
-    elif prod["discount"] > 20:
-        strategy_lines.append(f"- High discount ({prod['discount']}%). Maintain during campaigns.")
-
-    if avg_score < 0:
-        strategy_lines.append("- Negative sentiment detected. Investigate recurring complaints.")
-    elif avg_score < 0.2:
-        strategy_lines.append("- Neutral sentiment. Enhance product features or promotions.")
-    else:
-        strategy_lines.append("- Positive sentiment! Highlight strengths in campaigns.")
-
-    if total_reviews < 10:
-        strategy_lines.append("- Very few reviews. Encourage customers to share feedback.")
-    elif total_reviews > 100:
-        strategy_lines.append("- High review volume. Mine insights for product improvements.")
 
     sentiment_status = "Needs Improvement" if avg_score < 0.2 else "Good" if avg_score < 0.5 else "Excellent"
     sentiment_class = "negative-sentiment" if avg_score < 0.2 else "neutral-sentiment" if avg_score < 0.5 else "positive-sentiment"
@@ -330,9 +515,53 @@ def strategic_recommendations(analyzer, product_name):
     )
 
     st.markdown("### Recommended Strategy")
-    st.markdown("\n".join(strategy_lines))
+    st.markdown(prod["strategy"])
 
 
+NOTIFICATION_COLUMNS = ["timestamp", "type", "message"]
+
+
+# A log record starts with its timestamp; message bodies span several lines
+_RECORD_START = re.compile(rb"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},", re.MULTILINE)
+
+
+def _parse_notifications(source):
+    """Read only the displayed notification columns with pyarrow's CSV reader."""
+    table = pacsv.read_csv(
+        source,
+        # alert bodies span several lines inside quoted fields
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(include_columns=NOTIFICATION_COLUMNS,
+                                             include_missing_columns=True))
+    return table.to_pandas()
+
+
+@st.cache_data(show_spinner=False)
+def _read_notifications(path, mtime):
+    return _parse_notifications(path)
+
+
+def _tail_notifications(path, n=5, chunk=8192):
+    """Parse only the last n records, reading the file backwards from the end."""
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = f.tell()
+        pos = f.seek(0, os.SEEK_END)
+        buf = b""
+        while pos > start:
+            step = min(chunk, pos - start)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            # stop once n full records are in hand (the first match may be mid-record)
+            if len(_RECORD_START.findall(buf)) > n:
+                break
+    offsets = [m.start() for m in _RECORD_START.finditer(buf)]
+    tail = buf[offsets[max(len(offsets) - n, 0)]:] if offsets else b""
+    return _parse_notifications(io.BytesIO(header + tail))
+
+
+@st.fragment
 def notifications_section(notifications_file="data/notifications.csv"):
     st.info("🔔 Displaying notifications and alerts.")
     if not os.path.exists(notifications_file) or os.path.getsize(notifications_file) == 0:
@@ -340,15 +569,16 @@ def notifications_section(notifications_file="data/notifications.csv"):
         st.info("No notifications available.")
         return
     try:
-        df = pd.read_csv(notifications_file)
+        df = _read_notifications(notifications_file, os.path.getmtime(notifications_file))
         if df.empty:
             st.info("No notifications to display.")
             return
         st.dataframe(df, width='stretch')
         st.markdown("### Recent Alerts")
-        for _, row in df.tail(5).iterrows():
-            st.write(f"- **[{row['timestamp']}]** {row['message']}")
-    except pd.errors.EmptyDataError:
+        recent = _tail_notifications(notifications_file)[["timestamp", "message"]]
+        for timestamp, message in recent.itertuples(index=False, name=None):
+            st.write(f"- **[{timestamp}]** {message}")
+    except ValueError:  # pyarrow.ArrowInvalid, e.g. an empty file
         st.info("No notifications available.")
 
 # ---------------- Main App ----------------
@@ -373,9 +603,13 @@ def main():
 
     # This part only runs AFTER a successful login.
     st.markdown('<div class="main-header">E-Commerce Competitor Strategy Dashboard</div>', unsafe_allow_html=True)
-    analyzer = CompetitorAnalyzer()
-    if not analyzer.load_data():
-        st.stop()
+    # Build the analyzer (loads, indexes, batch predictions) once per session
+    if "analyzer" not in st.session_state:
+        analyzer = CompetitorAnalyzer()
+        if not analyzer.load_data():
+            st.stop()
+        st.session_state["analyzer"] = analyzer
+    analyzer = st.session_state["analyzer"]
 
     section = st.sidebar.radio("Navigate", [
         "Product Analysis",
@@ -383,7 +617,7 @@ def main():
         "Strategic Recommendations",
         "Notifications"
     ])
-    product = st.sidebar.selectbox("Select Product", analyzer.products_df["product_name"].unique())
+    product = st.sidebar.selectbox("Select Product", analyzer.products_df["product_name"].unique().tolist())
 
     if section == "Product Analysis":
         product_analysis(analyzer, product)
@@ -59,6 +59,15 @@ def remove_emojis(text):
         return text
     return re.sub(r'[^A-Za-z0-9.,!?;:\'"()\-\s]', '', text)
 
+def save_parquet(df, csv_path):
+    """Write a Parquet sibling of csv_path so the dashboard can skip CSV parsing"""
+    parquet_path = os.path.splitext(csv_path)[0] + ".parquet"
+    try:
+        df.to_parquet(parquet_path, index=False)
+        logging.info(f"✅ Parquet copy saved: {parquet_path}")
+    except Exception as e:
+        logging.warning(f"Could not write Parquet copy {parquet_path}: {e}")
+
 # ---------------- CLEANING FUNCTIONS ----------------
 
 def clean_reviews(df):
@@ -97,6 +106,7 @@ def main():
         logging.info(f"Cleaned mobile data: {len(df_mobile_clean)} rows")
         df_mobile_clean.to_csv(os.path.join(DATA_DIR, OUTPUT_MOBILE), index=False, encoding="utf-8-sig")
         logging.info(f"✅ Cleaned mobile data saved: {DATA_DIR}/{OUTPUT_MOBILE}")
+        save_parquet(df_mobile_clean, os.path.join(DATA_DIR, OUTPUT_MOBILE))
 
         train_price_model_lgbm(df_mobile_clean)
     else:
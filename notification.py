@@ -1,21 +1,40 @@
 print("DEBUG: notification.py module imported!")
 
 import os
+import csv
+import json
+import hashlib
+import functools
+from contextlib import contextmanager
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
 from datetime import datetime
+from snapshot_io import read_snapshot
 
 # -------------------------------
 # LOAD ENV
 # -------------------------------
-load_dotenv(dotenv_path="env/.env")
+# Loaded on first use, not at import: the dashboard imports this module on reruns
+@functools.lru_cache(maxsize=1)
+def _env():
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "env", ".env"))
+    return True
+
+
+def _email_config():
+    """(sender, receiver, password) from the environment / env/.env."""
+    _env()
+    return os.getenv("EMAIL_ADDRESS"), os.getenv("EMAIL_RECEIVER"), os.getenv("EMAIL_PASSWORD")
 
 # -------------------------------
 # CONFIG
 # -------------------------------
+# Snapshots are read from their Parquet siblings when fresh (see snapshot_io)
 CSV_TODAY_MOBILE = "My_docs/mobile.csv"
 CSV_YESTERDAY_MOBILE = "My_docs/mobile_yesterday.csv"
 
@@ -23,159 +42,371 @@ CSV_TODAY_REVIEW = "My_docs/review.csv"
 CSV_YESTERDAY_REVIEW = "My_docs/review_yesterday.csv"
 
 NOTIF_LOG = "data/notifications.csv"  # 📌 dashboard will read this
+NOTIF_IDS = "data/notification_ids.txt"  # one unique_id per line, appended with the log
+NOTIF_STATE = "data/.notif_state.json"  # snapshot mtimes each check last ran against
 
 PRICE_DROP_THRESHOLD = 10  # % drop
 NEGATIVE_REVIEW_THRESHOLD = 2  # alerts if new negatives > this
+DIGEST_MAX_REVIEWS = 50  # reviews listed in the negative-review digest email
+
+# Explicit dtypes for the snapshot columns we read (no inference pass).
+# productid is a Flipkart hex id, not a number; prices/ratings stay raw
+# text and are coerced where they are compared.
+SNAPSHOT_DTYPES = {
+    "productid": "string[pyarrow]",
+    "mobilename": "string[pyarrow]",
+    "sellingprice": "string[pyarrow]",
+    "userid": "string[pyarrow]",
+    "review": "string[pyarrow]",
+    "rating": "string[pyarrow]",
+}
+
+# -------------------------------
+# CACHED LOADERS
+# -------------------------------
+# Keyed on mtime: repeated runs in one process (dashboard reruns) skip re-parsing
+# until the file is rewritten. Plain lru_cache since this module also runs outside Streamlit.
+@functools.lru_cache(maxsize=8)
+def _load_snapshot(path, mtime, columns):
+    return read_snapshot(path, list(columns), {col: SNAPSHOT_DTYPES[col] for col in columns})
+
+
+def load_snapshot(path, columns):
+    """Cached snapshot read; callers get their own copy to mutate."""
+    return _load_snapshot(path, os.path.getmtime(path), tuple(columns)).copy()
+
+
+@functools.lru_cache(maxsize=1)
+def _load_sent_ids(path, mtime):
+    # csv.reader only to unquote the rare id that contains a newline
+    with open(path, newline="", encoding="utf-8") as f:
+        return frozenset(row[0] for row in csv.reader(f) if row)
+
+
+def _read_log_ids(path):
+    """unique_id column of the full notification log (used once, to seed NOTIF_IDS)."""
+    try:
+        # Only the id column is converted; small blocks since the log is mostly message text
+        table = pacsv.read_csv(
+            path,
+            read_options=pacsv.ReadOptions(block_size=262_144),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=["unique_id"],
+                include_missing_columns=True,
+                column_types={"unique_id": pa.string()}))
+        return frozenset(table.column("unique_id").drop_null().to_pylist())
+    except pa.ArrowInvalid:  # empty log
+        return frozenset()
+
+
+def _write_ids(ids, mode="a"):
+    with open(NOTIF_IDS, mode, newline="", encoding="utf-8") as f:
+        csv.writer(f, lineterminator="\n").writerows([uid] for uid in ids)
 
-EMAIL_SENDER = os.getenv("EMAIL_ADDRESS")
-EMAIL_RECEIVER = os.getenv("EMAIL_RECEIVER")
-EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")      # from .env
 
 # --- THE FIX: Load the IDs of already sent notifications ---
-def get_sent_notification_ids():
-    """Reads the unique IDs from the log file to prevent duplicates."""
-    if not os.path.exists(NOTIF_LOG):
-        return []
+def get_sent_notification_ids() -> set[str]:
+    """Reads the unique IDs of sent notifications from the NOTIF_IDS sidecar (set: O(1) lookups)."""
+    if not os.path.exists(NOTIF_IDS):
+        if not os.path.exists(NOTIF_LOG):
+            return set()
+        # Logs written before the sidecar existed: seed it from the log once
+        ids = _read_log_ids(NOTIF_LOG)
+        _write_ids(ids, mode="w")
+        return set(ids)
+    return set(_load_sent_ids(NOTIF_IDS, os.path.getmtime(NOTIF_IDS)))
+
+
+def _uid(kind, *parts):
+    """Fixed-width notification id: 128-bit blake2b of the kind and its key fields."""
+    h = hashlib.blake2b(kind.encode(), digest_size=16)
+    for part in parts:
+        h.update(b"\x1f" + str(part).encode())  # unit separator: ("a-b", "c") != ("a", "b-c")
+    return h.hexdigest()
+
+# -------------------------------
+# RUN STATE (skip unchanged snapshots)
+# -------------------------------
+def _snapshot_key(*paths):
+    return "|".join(f"{path}:{os.path.getmtime(path)}" for path in paths)
+
+
+def _load_state():
     try:
-        df = pd.read_csv(NOTIF_LOG)
-        if "unique_id" in df.columns:
-            return df["unique_id"].tolist()
-        return []
-    except pd.errors.EmptyDataError:
-        return []
+        with open(NOTIF_STATE, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_state(updates):
+    """Record the snapshot keys checks last ran on (write-then-rename, never half-written)."""
+    state = _load_state()
+    state.update(updates)
+    os.makedirs(os.path.dirname(NOTIF_STATE), exist_ok=True)
+    with open(NOTIF_STATE + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(NOTIF_STATE + ".tmp", NOTIF_STATE)
 
 # -------------------------------
 # EMAIL HELPER
 # -------------------------------
-def send_email(subject, body):
-    print(f"DEBUG: Attempting to send email to {EMAIL_RECEIVER} with subject '{subject}'")
+class _LazySMTP:
+    """SMTP connection opened on the first message and reused for the rest."""
+
+    def __init__(self):
+        self._server = None
+
+    def _connect(self):
+        sender, _, password = _email_config()
+        server = smtplib.SMTP_SSL("smtp.gmail.com", 465)
+        try:
+            server.login(sender, password)
+        except Exception:
+            server.close()
+            raise  # reported by send_email; the next message tries again
+        self._server = server
+
+    def sendmail(self, *args):
+        if self._server is None:
+            self._connect()
+        try:
+            return self._server.sendmail(*args)
+        except (smtplib.SMTPException, OSError):
+            # Dropped/idle-timed-out connection: start a fresh one and retry this message once
+            self.close()
+            self._connect()
+            return self._server.sendmail(*args)
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+
+@contextmanager
+def smtp_session():
+    """One SMTP connection for a whole run (TLS handshake + auth paid once).
+
+    Connects lazily, so a run that sends nothing never touches the server.
+    """
+    session = _LazySMTP()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def send_email(subject, body, server=None):
+    """Send one alert; returns True only if the server accepted it."""
+    sender, receiver, password = _email_config()
+    print(f"DEBUG: Attempting to send email to {receiver} with subject '{subject}'")
     try:
         msg = MIMEMultipart()
-        msg["From"] = EMAIL_SENDER
-        msg["To"] = EMAIL_RECEIVER
+        msg["From"] = sender
+        msg["To"] = receiver
         msg["Subject"] = subject
         msg.attach(MIMEText(body, "plain"))
 
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-            server.sendmail(EMAIL_SENDER, EMAIL_RECEIVER, msg.as_string())
+        if server is not None:
+            server.sendmail(sender, receiver, msg.as_string())
+        else:
+            with smtplib.SMTP_SSL("smtp.gmail.com", 465) as one_off:
+                one_off.login(sender, password)
+                one_off.sendmail(sender, receiver, msg.as_string())
 
         print(f"📧 Email sent → {subject}")
+        return True
     except Exception as e:
         print(f"⚠ Email send failed: {e}")
+        return False
 
 
 # -------------------------------
 # LOG TO CSV (for dashboard)
 # -------------------------------
-def log_notification(notif_type, message, unique_id):
-    """Logs a notification and its unique ID to prevent duplicates."""
-    os.makedirs(os.path.dirname(NOTIF_LOG), exist_ok=True)
+NOTIF_FIELDS = ["timestamp", "type", "message", "unique_id"]
+_PENDING_LOGS: list[dict] = []
+_PENDING_IDS: list[str] = []
+_PENDING_STATE: dict[str, str] = {}  # check -> snapshot key, saved once its alerts are logged
 
-    new_entry = pd.DataFrame([{
+
+def log_notification(notif_type, message, unique_id, extra_ids=()):
+    """Queues a notification and its unique ID; written by flush_notifications().
+
+    extra_ids are also recorded as sent (e.g. the reviews covered by a digest).
+    """
+    _PENDING_IDS.append(unique_id)
+    _PENDING_IDS.extend(extra_ids)
+    _PENDING_LOGS.append({
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "type": notif_type,
         "message": message,
         "unique_id": unique_id  # Add the unique ID to the log
-    }])
+    })
+    print(f"📝 Logged notification: {notif_type}")
 
-    if os.path.exists(NOTIF_LOG) and os.path.getsize(NOTIF_LOG) > 0:
-        new_entry.to_csv(NOTIF_LOG, mode="a", header=False, index=False)
-    else:
-        new_entry.to_csv(NOTIF_LOG, index=False)
 
-    print(f"📝 Logged notification: {notif_type}")
+def flush_notifications():
+    """Appends all queued notifications to the log in a single write, then marks their snapshots checked."""
+    if _PENDING_LOGS:
+        os.makedirs(os.path.dirname(NOTIF_LOG), exist_ok=True)
+        if not os.path.exists(NOTIF_IDS):
+            get_sent_notification_ids()  # seed the sidecar before appending to it
+        write_header = not (os.path.exists(NOTIF_LOG) and os.path.getsize(NOTIF_LOG) > 0)
+
+        with open(NOTIF_LOG, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=NOTIF_FIELDS, lineterminator=os.linesep)
+            if write_header:
+                writer.writeheader()
+            writer.writerows(_PENDING_LOGS)
+        _write_ids(_PENDING_IDS)
+
+        print(f"📝 Wrote {len(_PENDING_LOGS)} notification(s) to {NOTIF_LOG}")
+        _PENDING_LOGS.clear()
+        _PENDING_IDS.clear()
+
+    # Only after the log write: a failure above leaves the snapshots unchecked for the next run
+    if _PENDING_STATE:
+        _save_state(_PENDING_STATE)
+        _PENDING_STATE.clear()
 
 
 # -------------------------------
 # PRICE DROP CHECK
 # -------------------------------
-def check_price_drops(sent_ids):
+def check_price_drops(sent_ids: set[str], server=None):
     if not (os.path.exists(CSV_TODAY_MOBILE) and os.path.exists(CSV_YESTERDAY_MOBILE)):
         print("⚠ Missing mobile CSV files, skipping price check.")
         return
+    key = _snapshot_key(CSV_TODAY_MOBILE, CSV_YESTERDAY_MOBILE)
+    if _load_state().get("price_drops") == key:
+        print("✅ Mobile snapshots unchanged since last check, skipping price check.")
+        return
 
-    today = pd.read_csv(CSV_TODAY_MOBILE)
-    yesterday = pd.read_csv(CSV_YESTERDAY_MOBILE)
-
-    merged = pd.merge(today, yesterday, on="productid", suffixes=("_today", "_yesterday"))
-
-    for _, row in merged.iterrows():
-        try:
-            old_price = float(row["sellingprice_yesterday"])
-            new_price = float(row["sellingprice_today"])
-
-            if old_price > 0:
-                drop_percent = ((old_price - new_price) / old_price) * 100
-                if drop_percent >= PRICE_DROP_THRESHOLD:
-                    # --- THE FIX: Create and check the unique ID ---
-                    unique_id = f"price-{row['productid']}-{old_price}-{new_price}"
-                    if unique_id in sent_ids:
-                        continue  # Skip if we already sent this alert
-
-                    body = (
-                        f"Price Drop Alert 🚨\n\n"
-                        f"Product: {row['mobilename_today']}\n"
-                        f"Old Price: ₹{old_price}\n"
-                        f"New Price: ₹{new_price}\n"
-                        f"Drop: {drop_percent:.2f}%\n\n"
-                        f"Check competitor site immediately."
-                    )
-                    subject = f"⚠ Price Drop: {row['mobilename_today']}"
-                    send_email(subject, body)
-                    log_notification("Price Drop", body, unique_id)
-                    sent_ids.append(unique_id) # Update our list of sent IDs for this run
-
-        except Exception as e:
-            print(f"⚠ Error checking price for {row.get('mobilename_today')}: {e}")
+    # Snapshots accumulate one row per scrape: compare each product's latest price
+    today = (load_snapshot(CSV_TODAY_MOBILE, ["productid", "mobilename", "sellingprice"])
+             .dropna(subset=["productid"]).drop_duplicates("productid", keep="last")
+             .rename(columns={"mobilename": "name", "sellingprice": "p_today"}))
+    yesterday = (load_snapshot(CSV_YESTERDAY_MOBILE, ["productid", "sellingprice"])
+                 .dropna(subset=["productid"]).drop_duplicates("productid", keep="last")
+                 .rename(columns={"sellingprice": "p_yesterday"}))
+
+    # Coerce prices once per column; rows without a usable price can't alert, drop them before the join
+    today["p_today"] = pd.to_numeric(today["p_today"], errors="coerce").astype(float)
+    yesterday["p_yesterday"] = pd.to_numeric(yesterday["p_yesterday"], errors="coerce").astype(float)
+    today = today[today["p_today"] > 0]
+    yesterday = yesterday[yesterday["p_yesterday"] > 0]
+
+    merged = today.merge(yesterday, on="productid", how="inner", validate="one_to_one")
+
+    # Vectorized drop % over the whole catalog; only the alert subset is looped over
+    old_price = merged["p_yesterday"]
+    new_price = merged["p_today"]
+    drop_percent = (old_price - new_price) / old_price * 100
+
+    drops = drop_percent >= PRICE_DROP_THRESHOLD
+    alerts = pd.DataFrame({
+        "productid": merged.loc[drops, "productid"],
+        "mobilename": merged.loc[drops, "name"],
+        "old_price": old_price[drops],
+        "new_price": new_price[drops],
+        "drop_percent": drop_percent[drops],
+    })
+    # --- THE FIX: Create and check the unique ID ---
+    alerts["unique_id"] = [_uid("price", pid, old, new) for pid, old, new
+                           in zip(alerts["productid"], alerts["old_price"], alerts["new_price"])]
+    alerts = alerts[~alerts["unique_id"].isin(sent_ids)].drop_duplicates("unique_id")
+
+    failed = 0
+    for name, old, new, pct, unique_id in zip(alerts["mobilename"], alerts["old_price"],
+                                              alerts["new_price"], alerts["drop_percent"],
+                                              alerts["unique_id"]):
+        body = (
+            f"Price Drop Alert 🚨\n\n"
+            f"Product: {name}\n"
+            f"Old Price: ₹{old}\n"
+            f"New Price: ₹{new}\n"
+            f"Drop: {pct:.2f}%\n\n"
+            f"Check competitor site immediately."
+        )
+        subject = f"⚠ Price Drop: {name}"
+        if not send_email(subject, body, server):
+            failed += 1  # not recorded as sent, so the next run retries it
+            continue
+        log_notification("Price Drop", body, unique_id)
+        sent_ids.add(unique_id) # Update our set of sent IDs for this run
+
+    if not failed:  # otherwise leave the pair unchecked so the failed alerts are retried
+        _PENDING_STATE["price_drops"] = key
 
 
 # -------------------------------
 # NEGATIVE REVIEW CHECK
 # -------------------------------
-def check_negative_reviews(sent_ids):
+def check_negative_reviews(sent_ids: set[str], server=None):
     if not (os.path.exists(CSV_TODAY_REVIEW) and os.path.exists(CSV_YESTERDAY_REVIEW)):
         print("⚠ Missing review CSV files, skipping review check.")
         return
+    key = _snapshot_key(CSV_TODAY_REVIEW, CSV_YESTERDAY_REVIEW)
+    if _load_state().get("negative_reviews") == key:
+        print("✅ Review snapshots unchanged since last check, skipping review check.")
+        return
+
+    cols = ["productid", "mobilename", "userid", "review", "rating"]
+    today = load_snapshot(CSV_TODAY_REVIEW, cols).drop_duplicates()
+    yesterday = load_snapshot(CSV_YESTERDAY_REVIEW, cols).drop_duplicates()
 
-    today = pd.read_csv(CSV_TODAY_REVIEW).drop_duplicates()
-    yesterday = pd.read_csv(CSV_YESTERDAY_REVIEW).drop_duplicates()
+    # Anti-join to find *only* new reviews: hash yesterday's keys once, probe today's
+    keys = ["productid", "userid", "review"]
+    seen = pd.MultiIndex.from_frame(yesterday[keys].fillna(""))
+    new_reviews = today[~pd.MultiIndex.from_frame(today[keys].fillna("")).isin(seen)]
 
-    # A better way to find *only* new reviews
-    merged = today.merge(yesterday, on=['productid', 'userid', 'review'], how='left', indicator=True)
-    new_reviews = merged[merged['_merge'] == 'left_only']
-    
-    negatives = new_reviews[new_reviews["rating_x"].astype(str).isin(["1", "2"])]
+    # Ratings are read as text; older rows may hold "1.0", so compare numerically
+    negatives = new_reviews[pd.to_numeric(new_reviews["rating"], errors="coerce").isin([1, 2])]
 
     if len(negatives) >= NEGATIVE_REVIEW_THRESHOLD:
         print(f"Found {len(negatives)} new negative reviews. Sending alerts.")
-        # Send one alert per new negative review to track them individually
-        for _, row in negatives.iterrows():
-            # --- THE FIX: Create and check the unique ID for the review ---
-            unique_id = f"review-{row['productid']}-{row['userid']}-{row['review']}"
-            if unique_id in sent_ids:
-                continue # Skip if already sent
-            
+        # --- THE FIX: Create and check the unique ID for each review, over the filtered frame ---
+        negatives = negatives.assign(unique_id=[
+            _uid("review", pid, user, review)
+            for pid, user, review in zip(negatives["productid"], negatives["userid"], negatives["review"])])
+        negatives = negatives[~negatives["unique_id"].isin(sent_ids)].drop_duplicates("unique_id")
+
+        if not negatives.empty:
+            # One digest per run instead of one email per review
+            review_ids = negatives["unique_id"].tolist()
+            digest_id = _uid("review-digest", *sorted(review_ids))
+            count = len(negatives)
+            listed = negatives[["mobilename", "rating", "review"]].head(DIGEST_MAX_REVIEWS)
             body = (
                 f"Negative Review Alert 🚨\n\n"
-                f"A new negative review was found.\n\n"
-                f"Product: {row['mobilename_x']}\n"
-                f"Review: {row['review']}\n"
-                f"Rating: {row['rating_x']}\n"
+                f"{count} new negative review(s) were found.\n\n"
+                f"{listed.to_string(index=False, max_colwidth=100)}\n"
             )
-            subject = f"⚠ New Negative Review for {row['mobilename_x']}"
-            send_email(subject, body)
-            log_notification("Negative Review", body, unique_id)
-            sent_ids.append(unique_id)
+            if count > DIGEST_MAX_REVIEWS:
+                body += f"... and {count - DIGEST_MAX_REVIEWS} more.\n"
+            subject = f"⚠ {count} New Negative Review(s)"
+            if not send_email(subject, body, server):
+                return  # nothing recorded and the pair left unchecked: the next run retries
+            log_notification("Negative Review", body, digest_id, extra_ids=review_ids)
+            sent_ids.update(review_ids)
+            sent_ids.add(digest_id)
+
+    _PENDING_STATE["negative_reviews"] = key
 
 
 # -------------------------------
 # TEST NOTIFICATION
 # -------------------------------
-def send_test_notification(streamlit_callback=None):
+def send_test_notification(streamlit_callback=None, server=None):
     try:
         print("Sending test notification email...")
-        send_email("Test Notification", "This is a test notification email from your dashboard integration.")
+        send_email("Test Notification", "This is a test notification email from your dashboard integration.", server)
         print("Test notification email sent.")
         if streamlit_callback:
             streamlit_callback("✅ Test notification email sent.")
@@ -192,7 +423,11 @@ if __name__ == "__main__":
     print("🔍 Running notification checks...")
     # Get the list of IDs we've already sent alerts for
     sent_notification_ids = get_sent_notification_ids()
-    check_price_drops(sent_notification_ids)
-    check_negative_reviews(sent_notification_ids)
-    print("✅ Notification run complete.")
-    send_test_notification()
\ No newline at end of file
+    with smtp_session() as server:
+        try:
+            check_price_drops(sent_notification_ids, server)
+            check_negative_reviews(sent_notification_ids, server)
+        finally:
+            flush_notifications()  # log whatever was emailed, even if a later check raised
+        print("✅ Notification run complete.")
+        send_test_notification(server=server)
\ No newline at end of file
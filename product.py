@@ -14,6 +14,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service as ChromeService
 from webdriver_manager.chrome import ChromeDriverManager
+from snapshot_io import write_snapshot
 
 # ------------------------------
 # CONFIG
@@ -52,15 +53,17 @@ def clean_price(txt):
     return re.sub(r"[^\d]", "", txt) if txt else None
 
 def save_csv(df_new, path, subset_cols):
-    """Append to CSV if exists, drop duplicates."""
+    """Append to CSV if exists, drop duplicates; also refreshes the Parquet snapshot."""
     if os.path.exists(path):
-        df_old = pd.read_csv(path)
+        # Lossless read (every column as its text): a typed read would rewrite
+        # old rows, e.g. scraped_at timestamps in a different format than new ones
+        df_old = pd.read_csv(path, dtype=str, encoding="utf-8-sig")
         df = pd.concat([df_old, df_new], ignore_index=True)
     else:
         df = df_new
     if subset_cols:
         df = df.drop_duplicates(subset=subset_cols, keep="last")
-    df.to_csv(path, index=False, encoding="utf-8-sig")
+    write_snapshot(df, path)
     logging.info(f"Saved {len(df_new)} new rows (total {len(df)}) → {path}")
 
 # ------------------------------
@@ -1,21 +1,14 @@
 import pandas as pd
-import time
+import asyncio
 import os
 import re
-from openai import OpenAI
+import sys
+import functools
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 from dotenv import load_dotenv
 from tqdm import tqdm
-
-# --- Load API Key Securely from .env file ---
-# This path assumes your .env file is inside a folder named 'env'
-# If your .env file is in the same folder as the script, use: load_dotenv()
-load_dotenv(dotenv_path="env/.env")
-
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OpenAI API key not found. Please ensure 'env/.env' exists and contains OPENAI_API_KEY.")
-client = OpenAI(api_key=api_key)
-
+from snapshot_io import csv_to_parquet
 
 # --- Main Configuration ---
 INPUT_FILE = "data/cleaned_reviews.csv"
@@ -23,20 +16,34 @@ OUTPUT_FILE = "reviews_with_sentiment.csv"
 REVIEW_COLUMN = "review" # The column in your CSV with the review text
 MODEL = "gpt-4o-mini"
 BATCH_SIZE = 20
-RETRY_DELAY_SECONDS = 60
+# Batches in flight at once; size to your rate limit (requests per minute / 60)
+MAX_CONCURRENT_REQUESTS = int(os.getenv("SENTIMENT_CONCURRENCY", 8))
+INPUT_CHUNK_SIZE = 5_000    # reviews held in memory at a time
+ID_CHUNK_SIZE = 200_000     # rows per chunk when scanning already processed IDs
 
+# Compiled once; parse_sentiments runs for every batch
+_SENT_RE = re.compile(r'^\s*\d+\s*[:.]?\s*(Positive|Negative|Neutral)', re.IGNORECASE | re.MULTILINE)
+_CLEAN_RE = re.compile(r'[^\w\s.,!?-]')
+
+
+# --- Load API Key Securely from .env file ---
+# This path assumes your .env file is inside a folder named 'env' next to this script
+@functools.lru_cache(maxsize=1)
+def _env():
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "env", ".env"))
+    return True
 
 def clean_review_text(text: str) -> str:
     """Cleans the review text for processing."""
     if not isinstance(text, str):
         return ""
     text = text.strip().lower()
-    text = re.sub(r'[^\w\s.,!?-]', '', text)
+    text = _CLEAN_RE.sub('', text)
     return text
 
 def parse_sentiments(api_output: str, expected_count: int) -> list[str]:
     """Robustly parses sentiment labels from the API response."""
-    sentiments = re.findall(r'(?im)^\s*\d+\s*[:.]?\s*(Positive|Negative|Neutral)', api_output)
+    sentiments = _SENT_RE.findall(api_output)
     
     if len(sentiments) != expected_count:
         print(f"\n--- PARSING WARNING ---")
@@ -46,7 +53,15 @@ def parse_sentiments(api_output: str, expected_count: int) -> list[str]:
         
     return sentiments
 
-def get_sentiments_for_batch(reviews: list[str]) -> list[str]:
+# Transient errors: jittered exponential backoff capped at 30s; anything else
+# (bad request, auth) fails fast instead of retrying forever.
+@retry(
+    wait=wait_random_exponential(multiplier=1, max=30),
+    stop=stop_after_attempt(6),
+    retry=retry_if_exception_type((APIConnectionError, APITimeoutError, InternalServerError, RateLimitError)),
+    reraise=True,
+)
+async def get_sentiments_for_batch(reviews: list[str]) -> list[str]:
     """Sends a batch of reviews to the OpenAI API and gets sentiment classifications."""
     reviews_text = "\n".join([f"{i+1}. {review}" for i, review in enumerate(reviews)])
     
@@ -60,94 +75,124 @@ def get_sentiments_for_batch(reviews: list[str]) -> list[str]:
     
     user_prompt = f"Please classify the sentiment for the following reviews:\n\n{reviews_text}"
     
-    while True:
-        try:
-            response = client.chat.completions.create(
-                model=MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0,
-                seed=42
-            )
-            output = response.choices[0].message.content.strip()
-            return parse_sentiments(output, len(reviews))
-        except Exception as e:
-            print(f"\nAn API error occurred: {e}. Retrying in {RETRY_DELAY_SECONDS}s...")
-            time.sleep(RETRY_DELAY_SECONDS)
+    response = await client.chat.completions.create(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        temperature=0,
+        seed=42
+    )
+    output = response.choices[0].message.content.strip()
+    return parse_sentiments(output, len(reviews))
+
+async def classify_reviews(reviews: list[str], progress) -> list[str]:
+    """Classifies reviews in BATCH_SIZE batches, with up to MAX_CONCURRENT_REQUESTS calls in flight."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def bounded(batch):
+        async with semaphore:
+            sentiments = await get_sentiments_for_batch(batch)
+        progress.update(1)
+        return sentiments
+
+    batches = [reviews[i:i + BATCH_SIZE] for i in range(0, len(reviews), BATCH_SIZE)]
+    results = await asyncio.gather(*(bounded(batch) for batch in batches))  # keeps batch order
+    return [sentiment for batch in results for sentiment in batch]
 
 # --- Main Script Logic ---
 print("🚀 Starting sentiment analysis process...")
 
-# --- 1. Load Source Data (with better error handling) ---
+_env()
+api_key = os.getenv("OPENAI_API_KEY")
+if not api_key:
+    raise ValueError("OpenAI API key not found. Please ensure 'env/.env' exists and contains OPENAI_API_KEY.")
+# Retries are tenacity's job (see get_sentiments_for_batch); SDK retries off so they don't multiply
+client = AsyncOpenAI(api_key=api_key, max_retries=0, timeout=30)
+
+# --- 1. Check Source Data (with better error handling) ---
 if not os.path.exists(INPUT_FILE):
     print(f"❌ ERROR: Input file not found at '{INPUT_FILE}'.")
     print("Please make sure the file exists and the path is correct.")
     exit()
 
 try:
-    df = pd.read_csv(INPUT_FILE)
-    print(f"✅ Successfully loaded {len(df)} rows from {INPUT_FILE}.")
+    input_columns = list(pd.read_csv(INPUT_FILE, nrows=0).columns)
 except Exception as e:
     print(f"❌ ERROR: Could not read the CSV file. Reason: {e}")
     exit()
 
-# --- 2. Load Already Processed Data ---
+# Ensure source data has the required columns
+if 'productid' not in input_columns or 'userid' not in input_columns:
+    print("❌ ERROR: Input file is missing 'productid' or 'userid' columns, which are required to track progress.")
+    exit()
+
+# --- 2. Load Already Processed IDs (streamed, ID columns only) ---
+processed_ids = set()
+output_columns = None  # header of the existing output file we append to
 if os.path.exists(OUTPUT_FILE):
     try:
-        df_processed = pd.read_csv(OUTPUT_FILE)
+        columns = list(pd.read_csv(OUTPUT_FILE, nrows=0).columns)
         # Ensure required columns exist before creating the ID set
-        if 'productid' in df_processed.columns and 'userid' in df_processed.columns:
-            processed_ids = set(df_processed['productid'].astype(str) + "_" + df_processed['userid'].astype(str))
-            print(f"✅ Found {len(df_processed)} already processed reviews in {OUTPUT_FILE}.")
+        if 'productid' in columns and 'userid' in columns:
+            for ids in pd.read_csv(OUTPUT_FILE, usecols=['productid', 'userid'], dtype=str, chunksize=ID_CHUNK_SIZE):
+                processed_ids.update(ids['productid'].astype(str) + "_" + ids['userid'].astype(str))
+            output_columns = columns
+            print(f"✅ Found {len(processed_ids)} already processed reviews in {OUTPUT_FILE}.")
         else:
             print(f"⚠️ WARNING: Output file '{OUTPUT_FILE}' is missing 'productid' or 'userid'. Treating as empty.")
-            df_processed = pd.DataFrame()
-            processed_ids = set()
     except Exception as e:
         print(f"⚠️ WARNING: Could not read the existing output file. Starting fresh. Reason: {e}")
-        df_processed = pd.DataFrame()
         processed_ids = set()
-else:
-    df_processed = pd.DataFrame()
-    processed_ids = set()
 
-# --- 3. Filter for Unprocessed Reviews ---
-# Ensure source dataframe has the required columns
-if 'productid' not in df.columns or 'userid' not in df.columns:
-    print("❌ ERROR: Input file is missing 'productid' or 'userid' columns, which are required to track progress.")
-    exit()
-    
-df['_unique_id'] = df['productid'].astype(str) + "_" + df['userid'].astype(str)
-unprocessed_df = df[~df['_unique_id'].isin(processed_ids)].copy()
+# --- 3. Stream Input, Classify Unprocessed Reviews, Append Results ---
+# Working set is one chunk: each chunk's results are appended to OUTPUT_FILE
+# before the next is read, so an interrupted run resumes where it stopped.
+async def process_new_reviews(output_columns):
+    total_new = 0
+    new_sentiment_counts = pd.Series(dtype="int64")
+    last_chunk_out = None
+    # tqdm draws on stderr; in cron/CI logs (no TTY) skip the bar and its per-update work
+    progress = tqdm(desc="Analyzing Batches", unit="batch", disable=not sys.stderr.isatty())
+
+    for chunk in pd.read_csv(INPUT_FILE, chunksize=INPUT_CHUNK_SIZE,
+                             dtype={'productid': str, 'userid': str, REVIEW_COLUMN: str}):
+        unique_ids = chunk['productid'].astype(str) + "_" + chunk['userid'].astype(str)
+        chunk_out = chunk[~unique_ids.isin(processed_ids)].copy()
+        if chunk_out.empty:
+            continue
+
+        reviews = chunk_out[REVIEW_COLUMN].fillna("").astype(str).tolist()
+        chunk_out['sentiment'] = await classify_reviews(reviews, progress)
+
+        if output_columns is None:
+            # New (or unusable) output file: start it with this chunk's header
+            output_columns = list(chunk_out.columns)
+            chunk_out.to_csv(OUTPUT_FILE, index=False)
+        else:
+            chunk_out.reindex(columns=output_columns).to_csv(OUTPUT_FILE, mode="a", header=False, index=False)
 
-if unprocessed_df.empty:
-    print("\n🎉 No new reviews to process. All done!")
-    exit()
+        total_new += len(chunk_out)
+        new_sentiment_counts = new_sentiment_counts.add(chunk_out['sentiment'].value_counts(), fill_value=0)
+        last_chunk_out = chunk_out
 
-print(f"\n🔍 Found {len(unprocessed_df)} new reviews to process.")
+    progress.close()
+    return total_new, new_sentiment_counts, last_chunk_out
 
-# --- 4. Process New Reviews in Batches with a Progress Bar ---
-all_new_sentiments = []
-# Using tqdm for a visual progress bar
-for i in tqdm(range(0, len(unprocessed_df), BATCH_SIZE), desc="Analyzing Batches"):
-    batch_df = unprocessed_df.iloc[i:i + BATCH_SIZE]
-    batch_reviews = batch_df[REVIEW_COLUMN].fillna("").astype(str).tolist()
-    
-    sentiments = get_sentiments_for_batch(batch_reviews)
-    all_new_sentiments.extend(sentiments)
+# One event loop for the whole run: the async client's connection pool is bound to it
+total_new, new_sentiment_counts, last_chunk_out = asyncio.run(process_new_reviews(output_columns))
 
-# --- 5. Combine and Save Results ---
-unprocessed_df['sentiment'] = all_new_sentiments
+if total_new == 0:
+    print("\n🎉 No new reviews to process. All done!")
+    exit()
 
-# Combine with previously processed data
-final_df = pd.concat([df_processed, unprocessed_df.drop(columns=['_unique_id'])], ignore_index=True)
-final_df.to_csv(OUTPUT_FILE, index=False)
+# --- 4. Refresh the Columnar Copy for the Dashboard (streamed) ---
+csv_to_parquet(OUTPUT_FILE)
 
 print("\n✅ Sentiment analysis complete!")
-print(f"Results saved to {OUTPUT_FILE}")
-print("\n--- Sample of Processed Reviews ---")
-print(final_df[[REVIEW_COLUMN, "sentiment"]].tail(10))
-print("\n--- Final Sentiment Distribution ---")
-print(final_df["sentiment"].value_counts())
\ No newline at end of file
+print(f"Processed {total_new} new reviews. Results saved to {OUTPUT_FILE}")
+print("\n--- Sample of Newly Processed Reviews ---")
+print(last_chunk_out[[REVIEW_COLUMN, "sentiment"]].tail(10))
+print("\n--- New Sentiment Distribution ---")
+print(new_sentiment_counts.astype(int).sort_values(ascending=False))
@@ -0,0 +1,88 @@
+"""
+Snapshot I/O helpers.
+CSV stays the interchange format; a Parquet sibling is written next to it
+so readers get typed, column-projected loads without CSV parsing.
+"""
+
+import os
+import csv
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+
+def parquet_path(csv_path):
+    """Path of the Parquet sibling of csv_path."""
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def fresh_parquet(csv_path):
+    """Return the Parquet sibling of csv_path if it is at least as new as the CSV."""
+    path = parquet_path(csv_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(csv_path):
+        return path
+    return None
+
+
+def read_snapshot(csv_path, columns=None, dtype=None):
+    """Read a snapshot, preferring its Parquet sibling; only `columns` are decoded.
+
+    Columns named in `dtype` are parsed as raw text (no inference pass, so ids
+    like "007" and ratings like "1" survive) and then cast, on both paths alike.
+    """
+    path = fresh_parquet(csv_path)
+    if path:
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        table = pacsv.read_csv(
+            csv_path,
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=columns or [],
+                column_types={col: pa.string() for col in (dtype or {})},
+                strings_can_be_null=True))  # empty field -> null, as in the Parquet copy
+        df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    return df.astype(dtype) if dtype else df
+
+
+def write_snapshot(df, csv_path):
+    """Atomically write the CSV, then refresh its Parquet sibling."""
+    # write-then-rename: never rewrite in place, yesterday's snapshot may be a hardlink
+    tmp = csv_path + ".tmp"
+    df.to_csv(tmp, index=False, encoding="utf-8-sig")
+    os.replace(tmp, csv_path)
+
+    pq_path = parquet_path(csv_path)
+    try:
+        # object columns mix scraped strings with numbers re-read from older files
+        typed = df.astype({col: "string" for col in df.select_dtypes("object").columns})
+        typed.to_parquet(pq_path + ".tmp", index=False, compression="zstd")
+        os.replace(pq_path + ".tmp", pq_path)
+    except Exception as e:
+        logging.warning(f"Could not write Parquet snapshot {pq_path}: {e}")
+
+
+def csv_to_parquet(csv_path, block_size=1 << 20):
+    """Stream a CSV into its Parquet sibling block by block (O(block) memory).
+
+    Columns are kept as strings: type inference per block could disagree
+    between blocks of an append-only file.
+    """
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f))
+
+    pq_path = parquet_path(csv_path)
+    try:
+        reader = pacsv.open_csv(
+            csv_path,
+            read_options=pacsv.ReadOptions(block_size=block_size),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(column_types={c: pa.string() for c in header}))
+        with pq.ParquetWriter(pq_path + ".tmp", reader.schema, compression="zstd") as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+        os.replace(pq_path + ".tmp", pq_path)
+    except Exception as e:
+        logging.warning(f"Could not write Parquet copy {pq_path}: {e}")
@@ -0,0 +1,103 @@
+"""
+Event-driven notification runner.
+Watches the snapshot folder and runs the matching check when a snapshot is
+rewritten, instead of re-running both checks on a schedule. Sent IDs are
+loaded once and kept in memory for the life of the process.
+
+Usage: python watch.py
+"""
+
+import os
+import time
+import logging
+import threading
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler, EVENT_TYPE_CREATED, EVENT_TYPE_MODIFIED, EVENT_TYPE_MOVED
+
+import notification as notif
+
+# ------------------------------
+# CONFIG
+# ------------------------------
+WATCH_DIR = os.path.dirname(notif.CSV_TODAY_MOBILE)
+DEBOUNCE = float(os.getenv("WATCH_DEBOUNCE", 2))  # seconds to let a scrape finish writing
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+# snapshot file -> check it feeds (runs in this order)
+CHECKS = {
+    os.path.basename(notif.CSV_TODAY_MOBILE): notif.check_price_drops,
+    os.path.basename(notif.CSV_YESTERDAY_MOBILE): notif.check_price_drops,
+    os.path.basename(notif.CSV_TODAY_REVIEW): notif.check_negative_reviews,
+    os.path.basename(notif.CSV_YESTERDAY_REVIEW): notif.check_negative_reviews,
+}
+
+
+class SnapshotHandler(FileSystemEventHandler):
+    """Collects the checks due after snapshot changes; the main loop runs them."""
+
+    def __init__(self):
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.changed = threading.Event()
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in (EVENT_TYPE_CREATED, EVENT_TYPE_MODIFIED, EVENT_TYPE_MOVED):
+            return
+        # Snapshots are written to a temp file and renamed into place: look at the move target
+        path = event.dest_path or event.src_path
+        check = CHECKS.get(os.path.basename(path))
+        if check:
+            with self.lock:
+                self.pending.add(check)
+            self.changed.set()
+
+    def take(self):
+        self.changed.clear()
+        with self.lock:
+            due, self.pending = self.pending, set()
+        return due
+
+
+def run_checks(due, sent_ids):
+    try:
+        with notif.smtp_session() as server:
+            for check in dict.fromkeys(CHECKS.values()):
+                if check not in due:
+                    continue
+                try:
+                    check(sent_ids, server)  # adds what it sends to sent_ids
+                except Exception as e:
+                    logging.warning(f"{check.__name__} failed: {e}")
+    finally:
+        notif.flush_notifications()  # also saves the state of the checks that completed
+
+
+def main():
+    os.makedirs(WATCH_DIR, exist_ok=True)
+    sent_ids = notif.get_sent_notification_ids()
+
+    handler = SnapshotHandler()
+    # Catch up on changes made while the watcher wasn't running
+    handler.pending.update(CHECKS.values())
+    handler.changed.set()
+
+    observer = Observer()
+    observer.schedule(handler, WATCH_DIR, recursive=False)
+    observer.start()
+    logging.info(f"Watching {WATCH_DIR} for snapshot changes (Ctrl+C to stop)")
+    try:
+        while True:
+            if not handler.changed.wait(1):
+                continue
+            time.sleep(DEBOUNCE)
+            run_checks(handler.take(), sent_ids)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        observer.stop()
+        observer.join()
+
+
+if __name__ == "__main__":
+    main()